@@ -1,5 +1,6 @@
 
 import pandas as pd
+import numpy as np
 import logging
 import os
 from perception import DataGovClient
@@ -14,16 +15,20 @@ class TemperatureAggregator:
     Aggregates real-time temperature data by Singapore Planning Area.
     """
     
-    def __init__(self, onemap_token=None):
+    def __init__(self, onemap_token=None, client=None):
         self.weather_client = DataGovClient()
         token = onemap_token or os.environ.get("ONEMAP_TOKEN")
-        self.onemap_client = OneMapClient(token=token)
+        self.onemap_client = client or OneMapClient(token=token)
         
-    def get_aggregated_data(self):
+    def get_aggregated_data(self, include_stations=True):
         """
         Fetches weather data, maps it to planning areas, and aggregates statistics.
+        Args:
+            include_stations (bool): Collect the per-area list of station names.
+                                     Skip it when only the temperature statistics are needed.
         Returns:
             pd.DataFrame: DataFrame with columns ['planning_area', 'avg_temp', 'max_temp', 'station_count', 'stations']
+                          ('stations' only if include_stations)
         """
         # Fetch raw weather points
         logger.info("Fetching real-time temperature data...")
@@ -37,39 +42,46 @@ class TemperatureAggregator:
         
         # Map points to Planning Areas
         logger.info("Mapping stations to Planning Areas...")
-        mapped_data = []
         
         # Ensure Planning Areas are loaded
         self.onemap_client.load_planning_areas()
         
-        for p in points:
-            lat, lon = p['lat'], p['lng']
-            area = self.onemap_client.get_planning_area(lat, lon)
-            
-            if area:
-                mapped_data.append({
-                    "planning_area": area,
-                    "temperature": p['value'],
-                    "station_name": p.get('name', p.get('station_id')),
-                    "lat": lat,
-                    "lon": lon
-                })
-            else:
-                logger.debug(f"Point {lat},{lon} ({p.get('name')}) not inside any known Planning Area.")
+        lats = np.array([p['lat'] for p in points], dtype=float)
+        lons = np.array([p['lng'] for p in points], dtype=float)
+        temps = np.array([p['value'] for p in points], dtype=float)
+        names = np.array([p.get('name', p.get('station_id')) for p in points], dtype=object)
+        
+        area_idx = self.onemap_client.get_planning_area_indices(lats, lons)
+        area_names = np.array([a['name'] for a in self.onemap_client.planning_areas], dtype=object)
+        mask = area_idx >= 0
+        
+        for i in np.flatnonzero(~mask):
+            logger.debug(f"Point {lats[i]},{lons[i]} ({names[i]}) not inside any known Planning Area.")
 
-        if not mapped_data:
+        if not mask.any():
             logger.warning("No points mapped to valid Planning Areas.")
             return pd.DataFrame()
             
-        # Create DataFrame and Aggregate
-        df = pd.DataFrame(mapped_data)
+        # Create DataFrame column-wise and Aggregate
+        columns = {
+            'planning_area': area_names[area_idx[mask]],
+            'temperature': temps[mask],
+            'lat': lats[mask],
+            'lon': lons[mask]
+        }
+        if include_stations:
+            columns['station_name'] = names[mask]
+        df = pd.DataFrame(columns)
         
-        result = df.groupby('planning_area').agg(
+        grouped = df.groupby('planning_area', sort=False)
+        result = grouped.agg(
             avg_temp=('temperature', 'mean'),
             max_temp=('temperature', 'max'),
-            station_count=('station_name', 'count'),
-            stations=('station_name', lambda x: list(x))
-        ).reset_index()
+            station_count=('temperature', 'count')
+        )
+        if include_stations:
+            result = result.join(grouped['station_name'].agg(list).rename('stations'))
+        result = result.reset_index()
         
         # Round decimals for cleaner output
         result['avg_temp'] = result['avg_temp'].round(1)
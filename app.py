@@ -1,5 +1,7 @@
 import os
 import datetime
+import time
+import markdown
 from dotenv import load_dotenv
 from google import genai
 from perception import PerceptionAgent
@@ -15,10 +17,40 @@ class MitigationAgent:
     """
     Generates strategic urban heat mitigation assessments using Google Gemini 2.0.
     """
+    CACHE_TTL = 300            # seconds an assessment is reused for the same station/temperature
+    RATE_LIMIT_BACKOFF = 60    # seconds to serve the simulated analysis after a 429
+
+    def __init__(self):
+        # (station_name, rounded temperature) -> (timestamp, response_text, response_html)
+        self._cache = {}
+        self._rate_limited_until = 0.0
+
     def assess_district(self, station_name, temperature, env_context=None):
         """
         Generates a strategic district-level assessment.
+        Repeated calls with the same inputs reuse the previous response for CACHE_TTL seconds.
+        """
+        return self._assess(station_name, temperature)[0]
+
+    def assess_district_html(self, station_name, temperature, env_context=None):
+        """
+        Same as assess_district, rendered to HTML.
+        Real Gemini responses reuse the HTML cached with them; fallbacks are rendered per call.
         """
+        return self._assess(station_name, temperature)[1]
+
+    def _assess(self, station_name, temperature):
+        """Returns (markdown_text, html); only genuine Gemini responses are cached."""
+        now = time.time()
+        key = (station_name, round(temperature, 1))
+        
+        cached = self._cache.get(key)
+        if cached and now - cached[0] < self.CACHE_TTL:
+            return cached[1], cached[2]
+        
+        if now < self._rate_limited_until:
+            return self._fallback(self._simulated_assessment(station_name, temperature))
+        
         prompt = f"""
         You are an AI Heat Mitigation Strategist for Singapore.
         
@@ -38,13 +70,29 @@ class MitigationAgent:
                 model='gemini-2.0-flash', 
                 contents=prompt
             )
-            return response.text
+            
+            # Drop expired entries so the cache stays bounded
+            self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.CACHE_TTL}
+            html = markdown.markdown(response.text)
+            self._cache[key] = (now, response.text, html)
+            return response.text, html
         except Exception as e:
             print(f"Gemini Error: {e}")
             
             # Rate Limit Handling (Fallback to Simulation)
             if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                return f"""
+                self._rate_limited_until = time.time() + self.RATE_LIMIT_BACKOFF
+                return self._fallback(self._simulated_assessment(station_name, temperature))
+            
+            return self._fallback(f"**System Alert:** Gemini is currently offline ({e}). Manual monitoring required for {station_name}.")
+
+    @staticmethod
+    def _fallback(text):
+        return text, markdown.markdown(text)
+
+    def _simulated_assessment(self, station_name, temperature):
+        """Markdown fallback shown while Gemini is rate-limited."""
+        return f"""
 ### **⚠️ AI Rate Notice**
 *Gemini is experiencing high traffic. Showing simulated analysis for **{station_name}**.*
 
@@ -61,8 +109,3 @@ class MitigationAgent:
 *   **Green Facades**: Mandate vertical greening for upcoming BTO projects in {station_name}.
 *   **Wind Corridors**: Review urban canyon effects in next Master Plan review.
 """
-            
-            return f"**System Alert:** Gemini is currently offline ({e}). Manual monitoring required for {station_name}."
-
-
-
@@ -1,5 +1,6 @@
 
 import pandas as pd
+import numpy as np
 import logging
 import os
 from onemap_client import OneMapClient
@@ -19,35 +20,48 @@ class ContextEnricher:
     THEMES_COMMERCIAL = ['hotels'] 
     THEMES_RESIDENTIAL = ['kindergartens', 'ssot_hawkercentres'] 
     
-    def __init__(self, onemap_token=None):
+    def __init__(self, onemap_token=None, client=None):
         token = onemap_token or os.environ.get("ONEMAP_TOKEN")
-        self.client = OneMapClient(token=token)
+        self.client = client or OneMapClient(token=token)
         self.planning_areas = []
         
-    def _fetch_and_map(self, theme_list):
+    @staticmethod
+    def _parse_latlng(latlng_str):
+        """Parses a OneMap 'lat,lng' string, returning (nan, nan) if malformed."""
+        try:
+            lat, lon = latlng_str.split(',', 1)
+            return float(lat), float(lon)
+        except (AttributeError, ValueError):
+            return np.nan, np.nan
+
+    def _fetch_all_themes(self):
+        """
+        Fetches every configured theme concurrently.
+        Returns a dict: { 'theme_name': [items...], ... }
+        """
+        return self.client.get_themes_bulk(self.THEMES_GREEN + self.THEMES_COMMERCIAL + self.THEMES_RESIDENTIAL)
+
+    def _fetch_and_map(self, theme_list, theme_data):
         """
-        Fetches data for all themes in the list and maps them to Planning Areas.
-        Returns a dict: { 'PLANNING_AREA_NAME': count, ... }
+        Maps pre-fetched items for all themes in the list to Planning Areas.
+        Returns a float array of counts aligned with self.client.planning_areas.
         """
-        counts = {}
+        coords = [
+            self._parse_latlng(item.get('LatLng'))
+            for theme in theme_list
+            for item in theme_data.get(theme, [])
+        ]
+        n_areas = len(self.client.planning_areas)
         
-        for theme in theme_list:
-            items = self.client.get_theme_data(theme)
-            for item in items:
-                latlng_str = item.get('LatLng', '')
-                if not latlng_str or ',' not in latlng_str:
-                     continue
-                     
-                lat, lon = latlng_str.split(',')
-                try:
-                    lat, lon = float(lat), float(lon)
-                    area = self.client.get_planning_area(lat, lon)
-                    if area:
-                        counts[area] = counts.get(area, 0) + 1
-                except ValueError:
-                    continue
-                    
-        return counts
+        if not coords:
+            return np.zeros(n_areas)
+        
+        lats, lons = np.array(coords, dtype=np.float64).T
+        valid = ~(np.isnan(lats) | np.isnan(lons))
+        
+        # Single point-in-polygon join over every item of every theme
+        area_idx = self.client.get_planning_area_indices(lats[valid], lons[valid])
+        return np.bincount(area_idx[area_idx >= 0], minlength=n_areas).astype(float)
 
     def get_context_features(self):
         """
@@ -56,14 +70,16 @@ class ContextEnricher:
         logger.info("Loading base Planning Area data...")
         self.client.load_planning_areas()
         
-        # Initialize DF with all known areas
+        # Initialize DF with all known areas (row order matches the count arrays)
         all_areas = [a['name'] for a in self.client.planning_areas]
         df = pd.DataFrame({'planning_area': all_areas})
         
+        logger.info("Fetching OneMap Themes...")
+        theme_data = self._fetch_all_themes()
+        
         # Process Greenery Themes
         logger.info("Processing Greenery Themes...")
-        green_counts = self._fetch_and_map(self.THEMES_GREEN)
-        df['green_count'] = df['planning_area'].map(green_counts).fillna(0)
+        df['green_count'] = self._fetch_and_map(self.THEMES_GREEN, theme_data)
         
         # Calculate approximate Green Ratio (0-1) relative to max
         max_green = df['green_count'].max()
@@ -71,29 +87,21 @@ class ContextEnricher:
         
         # Process Commercial/Residential Themes
         logger.info("Processing Commercial Themes...")
-        comm_counts = self._fetch_and_map(self.THEMES_COMMERCIAL)
+        df['comm_count'] = self._fetch_and_map(self.THEMES_COMMERCIAL, theme_data)
         logger.info("Processing Residential Themes...")
-        res_counts = self._fetch_and_map(self.THEMES_RESIDENTIAL)
+        df['res_count'] = self._fetch_and_map(self.THEMES_RESIDENTIAL, theme_data)
         
-        df['comm_count'] = df['planning_area'].map(comm_counts).fillna(0)
-        df['res_count'] = df['planning_area'].map(res_counts).fillna(0)
+        # Classify density from the commercial share of all counted amenities
+        c = df['comm_count'].to_numpy(dtype=float)
+        r = df['res_count'].to_numpy(dtype=float)
+        total = c + r
+        comm_ratio = np.divide(c, total, out=np.zeros_like(c), where=total > 0)
         
-        def determine_density(row):
-            c = row['comm_count']
-            r = row['res_count']
-            total = c + r
-            if total == 0:
-                return 'Unknown/Low Density'
-            
-            comm_ratio = c / total
-            if comm_ratio > 0.6:
-                return 'Commercial'
-            elif comm_ratio < 0.4:
-                return 'Residential'
-            else:
-                return 'Mixed'
-
-        df['density_type'] = df.apply(determine_density, axis=1)
+        df['density_type'] = np.select(
+            [total == 0, comm_ratio > 0.6, comm_ratio < 0.4],
+            ['Unknown/Low Density', 'Commercial', 'Residential'],
+            default='Mixed'
+        )
         
         return df[['planning_area', 'green_ratio', 'density_type', 'green_count', 'comm_count', 'res_count']]
 
@@ -0,0 +1,76 @@
+"""
+Context Snapshot Module
+Precomputes OneMap context features (green/commercial/residential counts) into a
+Parquet file. These change daily at most, so the real-time data fusion path can
+read the snapshot instead of re-fetching and re-mapping every theme.
+
+Run once a day, e.g. from cron:
+    python context_snapshot.py [output_path]
+"""
+
+import pandas as pd
+import logging
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from context_enricher import ContextEnricher
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Resolved next to this module so cron jobs and the web app agree regardless of working directory
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "context_features.parquet")
+MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+def write_snapshot(path=SNAPSHOT_PATH, onemap_token=None, client=None):
+    """
+    Computes context features live and writes them to a Parquet snapshot.
+    Returns:
+        str: The snapshot path, or None if no context data was available.
+    """
+    df = ContextEnricher(onemap_token=onemap_token, client=client).get_context_features()
+    if df.empty:
+        logger.error("No context data available; snapshot not written.")
+        return None
+    
+    # Failed theme fetches come back as empty lists, i.e. all-zero counts; persisting that
+    # would shadow live context for a whole day
+    if not df[['green_count', 'comm_count', 'res_count']].to_numpy().any():
+        logger.error("Every OneMap theme returned no items (outage or missing token?); snapshot not written.")
+        return None
+    
+    df.to_parquet(path, index=False)
+    logger.info(f"Context snapshot written to {path} ({len(df)} planning areas).")
+    return path
+
+
+def load_snapshot(path=SNAPSHOT_PATH, max_age=MAX_AGE_SECONDS):
+    """
+    Reads the context snapshot if it exists and is fresh.
+    Returns:
+        pd.DataFrame or None: None if the snapshot is missing, stale or unreadable.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    
+    age = time.time() - os.path.getmtime(path)
+    if age > max_age:
+        logger.info(f"Context snapshot {path} is stale ({age / 3600:.1f}h old).")
+        return None
+    
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Failed to read context snapshot {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # Pick up ONEMAP_TOKEN from .env when run standalone (e.g. from cron)
+    load_dotenv()
+    output_path = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_PATH
+    if not write_snapshot(output_path):
+        sys.exit(1)
@@ -4,8 +4,9 @@ from app import MitigationAgent
 from geo_enhanced import generate_heatmap_with_planning_areas
 from onemap_client import OneMapClient
 from trigger_rules_enhanced import EnhancedTriggerRules
+from cachetools import TTLCache
 import datetime
-import markdown
+import threading
 
 app = Flask(__name__)
 
@@ -13,12 +14,68 @@ app = Flask(__name__)
 perception = PerceptionAgent()
 mitigation_agent = MitigationAgent()
 onemap_client = OneMapClient()
-rules_engine = EnhancedTriggerRules()
+rules_engine = EnhancedTriggerRules(client=onemap_client)
 
 # Pre-load planning areas
 print("Loading planning areas...")
 onemap_client.load_planning_areas()
 
+# Short-lived caches for rule results and the rendered map. Weather readings are cached in
+# perception and Gemini assessments in MitigationAgent, so neither gets a second layer here.
+# Each cache has its own lock so concurrent misses regenerate a value only once; the assessment
+# lock just keeps concurrent misses from each calling Gemini.
+_risk_cache, _risk_lock = TTLCache(maxsize=8, ttl=60), threading.Lock()
+_map_cache, _map_lock = TTLCache(maxsize=4, ttl=30), threading.Lock()
+_assessment_lock = threading.Lock()
+
+
+def _cached(cache, lock, key, compute):
+    """Returns cache[key], computing and storing it on a miss (empty results are not stored)."""
+    with lock:
+        if key in cache:
+            return cache[key]
+        value = compute()
+        if value:
+            cache[key] = value
+        return value
+
+
+def get_weather():
+    # Freshness is owned by perception's 60 s response cache; a second TTL here would stack on top
+    return perception.get_island_wide_weather("air-temperature")
+
+
+def get_assessment_html(station_name, temperature):
+    """Gemini assessment rendered to HTML; MitigationAgent caches the HTML with the response."""
+    with _assessment_lock:
+        return mitigation_agent.assess_district_html(station_name, temperature)
+
+
+def get_evaluation_results():
+    return _cached(_risk_cache, _risk_lock, "evaluate_all", rules_engine.evaluate_all)
+
+
+def get_risk_data():
+    """Maps each planning area to its evaluated priority level."""
+    return {r['details']['planning_area']: r['priority'] for r in get_evaluation_results()}
+
+
+def render_map_html(points, risk_data):
+    """
+    Renders the Folium map to HTML, keyed on the readings and risk levels it shows
+    so a re-render only happens when the underlying data actually changes.
+    """
+    points_key = tuple(sorted((p.get('station_id'), round(p['value'], 1)) for p in points))
+    risk_key = tuple(sorted(risk_data.items()))
+    
+    def render():
+        m = generate_heatmap_with_planning_areas(
+            points, onemap_client.planning_areas, risk_data, onemap_client.planning_area_geojson
+        )
+        return m.get_root().render()
+    
+    return _cached(_map_cache, _map_lock, (points_key, risk_key), render)
+
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -64,7 +121,7 @@ HTML_TEMPLATE = """
                     Active Sensors: {{ count }}
                 </div>
             </div>
-            <iframe src="/map_content"></iframe>
+            <iframe srcdoc="{{ map_html }}"></iframe>
         </div>
 
         <!-- AI Sidebar -->
@@ -89,7 +146,7 @@ HTML_TEMPLATE = """
 @app.route('/')
 def dashboard():
     # Fetch real-time weather data
-    points = perception.get_island_wide_weather("air-temperature")
+    points = get_weather()
     
     # Identify Hotspot
     hotspot_name = "N/A"
@@ -101,8 +158,10 @@ def dashboard():
         hotspot_temp = hottest.get('value', 0)
     
     # Get AI Assessment from Gemini
-    ai_text = mitigation_agent.assess_district(hotspot_name, hotspot_temp)
-    ai_html = markdown.markdown(ai_text)
+    ai_html = get_assessment_html(hotspot_name, hotspot_temp)
+    
+    # Embed the map directly so the page needs no second /map_content round trip
+    map_html = render_map_html(points, get_risk_data())
     
     return render_template_string(
         HTML_TEMPLATE, 
@@ -110,27 +169,20 @@ def dashboard():
         count=len(points),
         hotspot_name=hotspot_name,
         hotspot_temp=hotspot_temp,
-        ai_analysis=ai_html
+        ai_analysis=ai_html,
+        map_html=map_html
     )
 
 @app.route('/map_content')
 def map_content():
-    points = perception.get_island_wide_weather("air-temperature")
+    points = get_weather()
     
     # Ensure planning areas are loaded
     if not onemap_client.planning_areas:
          onemap_client.load_planning_areas()
          
-    planning_areas_data = onemap_client.planning_areas
-    
-    # Evaluate risk for all areas
-    evaluation_results = rules_engine.evaluate_all()
-    risk_data = {r['details']['planning_area']: r['priority'] for r in evaluation_results}
-
-    # Generate Enhanced Heatmap with overlays
-    m = generate_heatmap_with_planning_areas(points, planning_areas_data, risk_data)
-    
-    return m.get_root().render()
+    # Generate Enhanced Heatmap with overlays (cached until readings or risk levels change)
+    return render_map_html(points, get_risk_data())
 
 if __name__ == '__main__':
     print("Starting HFC Dashboard on port 5000...")
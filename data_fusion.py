@@ -9,6 +9,8 @@ import logging
 import os
 from aggregator import TemperatureAggregator
 from context_enricher import ContextEnricher
+from onemap_client import OneMapClient
+from context_snapshot import SNAPSHOT_PATH, load_snapshot
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,12 +21,15 @@ class DataFusion:
     Combines temperature data and context features into a single dataset.
     """
     
-    def __init__(self, onemap_token=None):
+    def __init__(self, onemap_token=None, client=None, snapshot_path=SNAPSHOT_PATH):
         """
-        Initialize with optional OneMap token.
+        Initialize with optional OneMap token or a shared OneMapClient.
         If not provided, will use default from context_enricher.
+        Context features are read from snapshot_path when fresh; pass None to always compute live.
         """
         self.onemap_token = onemap_token
+        self.snapshot_path = snapshot_path
+        self.client = client or OneMapClient(token=onemap_token or os.environ.get("ONEMAP_TOKEN"))
         
     def get_unified_dataset(self):
         """
@@ -40,8 +45,8 @@ class DataFusion:
         
         # Fetch temperature data
         logger.info("Fetching temperature data...")
-        temp_agg = TemperatureAggregator(onemap_token=self.onemap_token)
-        temp_df = temp_agg.get_aggregated_data()
+        temp_agg = TemperatureAggregator(onemap_token=self.onemap_token, client=self.client)
+        temp_df = temp_agg.get_aggregated_data(include_stations=False)
         
         # We continue even if temp_df is empty, as we might still want context data
         if not temp_df.empty:
@@ -49,10 +54,14 @@ class DataFusion:
                 columns={'avg_temp': 'avg_temperature'}
             )
         
-        # Fetch context features
-        logger.info("Fetching context features...")
-        enricher = ContextEnricher(onemap_token=self.onemap_token)
-        context_df = enricher.get_context_features()
+        # Fetch context features (precomputed daily snapshot, falling back to live computation)
+        context_df = load_snapshot(self.snapshot_path)
+        if context_df is not None:
+            logger.info(f"Using context snapshot {self.snapshot_path}.")
+        else:
+            logger.info("Fetching context features...")
+            enricher = ContextEnricher(onemap_token=self.onemap_token, client=self.client)
+            context_df = enricher.get_context_features()
         
         if context_df.empty:
             logger.warning("No context data available.")
@@ -66,6 +75,13 @@ class DataFusion:
             unified_df = context_df
             unified_df['avg_temperature'] = pd.NA
         else:
+            # Shared categorical key so the join runs on integer codes instead of Python strings
+            area_dtype = pd.CategoricalDtype(
+                categories=pd.unique(pd.concat([temp_df['planning_area'], context_df['planning_area']]).dropna())
+            )
+            temp_df = temp_df.astype({'planning_area': area_dtype})
+            context_df = context_df.astype({'planning_area': area_dtype})
+            
             unified_df = pd.merge(
                 temp_df,
                 context_df,
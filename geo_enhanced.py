@@ -6,8 +6,9 @@ Adds planning area overlay with risk-based coloring to existing heatmap.
 import geopandas as gpd
 import folium
 from folium.plugins import HeatMap
-from folium.features import DivIcon
 from folium import GeoJson
+from branca.element import MacroElement
+from jinja2 import Template
 import json
 from shapely.geometry import mapping
 
@@ -21,6 +22,39 @@ RISK_COLORS = {
     'NO_DATA': '#808080'    # Gray
 }
 
+
+class StationLabels(MacroElement):
+    """
+    Station text labels rendered as a single JS block, instead of one
+    folium.Marker + DivIcon object (and template render) per station.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function(map) {
+            {{ this.script }}
+            })({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, data_points):
+        super().__init__()
+        self._name = 'StationLabels'
+        
+        js_markers = []
+        for p in data_points:
+            temp = p['value']
+            name = p.get('name', 'Station')
+            text_color = '#ff4444' if temp > 29 else '#00ccff'
+            html = f'''<div style="font-size: 10pt; font-weight: bold; color: {text_color}; text-shadow: 1px 1px 2px black; text-align: center;">{name}<br>{temp}°C</div>'''
+            # json.dumps yields a safe JS string literal; keep '</' from closing the script tag
+            html_js = json.dumps(html).replace('</', '<\\/')
+            js_markers.append(
+                f"L.marker([{p['lat']}, {p['lng']}], {{icon: L.divIcon({{className: 'empty', "
+                f"html: {html_js}, iconSize: [150, 36], iconAnchor: [75, 18]}})}}).addTo(map);"
+            )
+        self.script = "\n".join(js_markers)
+
+
 def visualize_geojson(file_path):
     """Utility to visualize a GeoJSON file."""
     try:
@@ -100,24 +134,12 @@ def generate_heatmap(data_points):
     ).add_to(m)
     
     # Add visible text labels for stations
-    for p in data_points:
-        temp = p['value']
-        name = p.get('name', 'Station')
-        text_color = '#ff4444' if temp > 29 else '#00ccff'
-        
-        folium.Marker(
-            location=[p['lat'], p['lng']],
-            icon=DivIcon(
-                icon_size=(150,36),
-                icon_anchor=(75, 18),
-                html=f'''<div style="font-size: 10pt; font-weight: bold; color: {text_color}; text-shadow: 1px 1px 2px black; text-align: center;">{name}<br>{temp}°C</div>'''
-            )
-        ).add_to(m)
+    StationLabels(data_points).add_to(m)
         
     return m
 
 
-def generate_heatmap_with_planning_areas(data_points, planning_areas_data=None, risk_data=None):
+def generate_heatmap_with_planning_areas(data_points, planning_areas_data=None, risk_data=None, planning_area_geojson=None):
     """
     Enhanced heatmap with planning area overlay and risk-based coloring.
     
@@ -125,6 +147,7 @@ def generate_heatmap_with_planning_areas(data_points, planning_areas_data=None,
         data_points: List of dicts {'lat': float, 'lng': float, 'value': float}
         planning_areas_data: List of dicts from OneMapClient.planning_areas
         risk_data: Dict mapping planning_area -> priority level (CRITICAL/HIGH/MEDIUM/LOW/NORMAL)
+        planning_area_geojson: Optional precomputed FeatureCollection from OneMapClient.planning_area_geojson
     
     Returns:
         folium.Map object with all layers
@@ -134,12 +157,12 @@ def generate_heatmap_with_planning_areas(data_points, planning_areas_data=None,
     
     # Add planning area overlay if provided
     if planning_areas_data and risk_data:
-        m = add_planning_area_overlay(m, planning_areas_data, risk_data)
+        m = add_planning_area_overlay(m, planning_areas_data, risk_data, planning_area_geojson)
     
     return m
 
 
-def add_planning_area_overlay(map_obj, planning_areas_data, risk_data):
+def add_planning_area_overlay(map_obj, planning_areas_data, risk_data, planning_area_geojson=None):
     """
     Adds planning area polygons with risk-based coloring to existing map.
     
@@ -147,28 +170,46 @@ def add_planning_area_overlay(map_obj, planning_areas_data, risk_data):
         map_obj: Folium Map object
         planning_areas_data: List of dicts from OneMapClient.planning_areas
         risk_data: Dict mapping planning_area -> priority level
+        planning_area_geojson: Optional precomputed FeatureCollection; if given, geometries are
+                               reused and only the priority property is patched
     
     Returns:
         Modified map_obj
     """
     
-    # Convert planning areas to GeoJSON
-    geojson_features = []
-    for area in planning_areas_data:
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "pln_area_n": area['name'],
-                "priority": risk_data.get(area['name'], 'NO_DATA')
-            },
-            "geometry": mapping(area['geometry'])
+    if planning_area_geojson is not None:
+        # Shallow copies share the cached geometry dicts
+        geojson = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    **feature,
+                    "properties": {
+                        **feature["properties"],
+                        "priority": risk_data.get(feature["properties"]["pln_area_n"], 'NO_DATA')
+                    }
+                }
+                for feature in planning_area_geojson["features"]
+            ]
+        }
+    else:
+        # Convert planning areas to GeoJSON
+        geojson_features = []
+        for area in planning_areas_data:
+            feature = {
+                "type": "Feature",
+                "properties": {
+                    "pln_area_n": area['name'],
+                    "priority": risk_data.get(area['name'], 'NO_DATA')
+                },
+                "geometry": mapping(area['geometry'])
+            }
+            geojson_features.append(feature)
+        
+        geojson = {
+            "type": "FeatureCollection",
+            "features": geojson_features
         }
-        geojson_features.append(feature)
-    
-    geojson = {
-        "type": "FeatureCollection",
-        "features": geojson_features
-    }
     
     # Style function based on risk level
     def style_function(feature):
@@ -0,0 +1,43 @@
+"""
+HTTP Session Helpers
+Pooled keep-alive requests sessions with retries and a default timeout,
+shared by the OneMap and Data.gov.sg clients.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests that don't set one."""
+    
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(timeout, pool_connections=10, pool_maxsize=20, retries=3, backoff_factor=0.3):
+    """
+    Creates a requests.Session that reuses connections per host and retries transient errors.
+    
+    Args:
+        timeout (float): Default timeout in seconds for every request on the session.
+        pool_connections (int): Number of per-host connection pools to keep.
+        pool_maxsize (int): Maximum connections kept alive per pool.
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        timeout=timeout,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=retries, backoff_factor=backoff_factor)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
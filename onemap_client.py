@@ -1,26 +1,188 @@
 
 import requests
 import json
+import orjson
 import os
-from shapely.geometry import shape, Point
+import pickle
+import time
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape, mapping, Point
 from shapely.strtree import STRtree
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http_session import create_session
+from pip_kernel import NUMBA_AVAILABLE, candidates_csr, flatten_polygons, pip_batch, pip_bulk
+
+try:
+    import ijson
+except ImportError:  # optional: stream large theme payloads instead of buffering them
+    ijson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# On-disk cache of parsed planning-area polygons (boundaries only change between Master Plan years)
+PLANNING_AREA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "greenguardian")
+PLANNING_AREA_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+
+def _planning_area_cache_path(year):
+    return os.path.join(PLANNING_AREA_CACHE_DIR, f"planning_{year}.pkl")
+
+
+def _load_cached_planning_areas(year):
+    """Reads parsed planning areas from the disk cache, or returns None if missing/stale/unreadable."""
+    path = _planning_area_cache_path(year)
+    if not os.path.exists(path):
+        return None
+    
+    if time.time() - os.path.getmtime(path) > PLANNING_AREA_CACHE_MAX_AGE:
+        logger.info(f"Planning area cache {path} is stale, refetching.")
+        return None
+    
+    try:
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+        geometries = shapely.from_wkb(cached["wkb"])
+        return [
+            {"name": name, "geometry": geometry, "raw": raw}
+            for name, geometry, raw in zip(cached["names"], geometries, cached["raw"])
+        ]
+    except Exception as e:
+        logger.warning(f"Failed to read planning area cache {path}: {e}")
+        return None
+
+
+def _save_cached_planning_areas(year, parsed_areas):
+    """Writes parsed planning areas to the disk cache as WKB; failures are logged, not raised."""
+    path = _planning_area_cache_path(year)
+    try:
+        os.makedirs(PLANNING_AREA_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "names": [a["name"] for a in parsed_areas],
+                "wkb": [shapely.to_wkb(a["geometry"]) for a in parsed_areas],
+                "raw": [a["raw"] for a in parsed_areas]
+            }, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to write planning area cache {path}: {e}")
+
+
+def _fetch_planning_areas(token, year):
+    """Fetches planning area GeoJSON from OneMap and parses it into polygons."""
+    endpoint = f"{OneMapClient.BASE_URL}/popapi/getAllPlanningarea"
+    params = {"year": year}
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = token
+    
+    try:
+        logger.info(f"Fetching planning areas from {endpoint}...")
+        with create_session(timeout=OneMapClient.REQUEST_TIMEOUT) as session:
+            response = session.get(endpoint, headers=headers, params=params)
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        if isinstance(data, dict):
+            data = data.get("SearchResults", data.get("results", []))
+        
+        parsed_areas = []
+        for item in data:
+            try:
+                geo_json_raw = item.get('geojson')
+                geo_json = orjson.loads(geo_json_raw) if isinstance(geo_json_raw, str) else geo_json_raw
+                polygon = shape(geo_json)
+                parsed_areas.append({
+                    "name": item.get("pln_area_n", "UNKNOWN"),
+                    "geometry": polygon,
+                    "raw": item
+                })
+            except Exception as e:
+                logger.warning(f"Failed to parse planning area {item.get('pln_area_n')}: {e}")
+        
+        return parsed_areas
+        
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error serving OneMap API request: {e}")
+        raise
+
+
+class _NoPlanningAreas(Exception):
+    """Raised out of _shared_planning_areas so lru_cache never memoizes an empty load."""
+
+
+@lru_cache(maxsize=4)
+def _shared_planning_areas(token, year):
+    """
+    Loads, parses and indexes planning area polygons once per process.
+    Every OneMapClient shares the result, so polygons and the STRtree are built once.
+    Parsed polygons are also cached on disk per year to skip the OneMap fetch on restart.
+    
+    Returns:
+        tuple: (planning_areas, STRtree over the prepared geometries, GeoJSON FeatureCollection,
+                flattened polygon arrays for the JIT kernel or None without Numba)
+    """
+    parsed_areas = _load_cached_planning_areas(year)
+    if parsed_areas is None:
+        parsed_areas = _fetch_planning_areas(token, year)
+        if parsed_areas:
+            _save_cached_planning_areas(year, parsed_areas)
+    else:
+        logger.info(f"Loaded planning areas for {year} from disk cache.")
+    
+    if not parsed_areas:
+        raise _NoPlanningAreas(year)
+    
+    # Only polygons whose bounding box contains a point need a full test
+    # Prepare in place so every contains() test on these polygons uses GEOS's edge index
+    geometries = [a["geometry"] for a in parsed_areas]
+    shapely.prepare(geometries)
+    spatial_index = STRtree(geometries, node_capacity=10)
+    polygon_arrays = flatten_polygons(geometries) if NUMBA_AVAILABLE else None
+    
+    # Static overlay geometry; only the per-area priority changes per render
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"pln_area_n": a["name"], "priority": "NO_DATA"},
+                "geometry": mapping(a["geometry"])
+            }
+            for a in parsed_areas
+        ]
+    }
+    
+    logger.info(f"Successfully loaded {len(parsed_areas)} planning areas.")
+    return parsed_areas, spatial_index, geojson, polygon_arrays
+
 class OneMapClient:
     """
     Client for Singapore OneMap API to map coordinates to Planning Areas.
     """
     
     BASE_URL = "https://www.onemap.gov.sg/api/public"
+    REQUEST_TIMEOUT = 15
+    JIT_BATCH_THRESHOLD = 256  # batches above this skip the STRtree and run the compiled scan directly
     
     def __init__(self, token=None):
         self.token = token or os.environ.get("ONEMAP_TOKEN")
         self.planning_areas = []
         self.spatial_index = None
+        self.planning_area_geojson = None
+        self._extent = None
+        # Boundaries are static for the process lifetime, so repeated lookups can be memoized
+        self._cached_lookup = lru_cache(maxsize=4096)(self._lookup_planning_area)
+        self._polygon_arrays = None
+        
+        # Keep-alive pool shared by concurrent theme fetches, with retries and a default timeout
+        self.session = create_session(timeout=self.REQUEST_TIMEOUT)
         
     def _get_headers(self):
         headers = {"Content-Type": "application/json"}
@@ -34,38 +196,19 @@ class OneMapClient:
             logger.info("Using cached planning areas.")
             return
 
-        endpoint = f"{self.BASE_URL}/popapi/getAllPlanningarea"
-        params = {"year": year}
-        
         try:
-            logger.info(f"Fetching planning areas from {endpoint}...")
-            response = requests.get(endpoint, headers=self._get_headers(), params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            if isinstance(data, dict):
-                data = data.get("SearchResults", data.get("results", []))
-            
-            parsed_areas = []
-            for item in data:
-                try:
-                    geo_json_raw = item.get('geojson')
-                    geo_json = json.loads(geo_json_raw) if isinstance(geo_json_raw, str) else geo_json_raw
-                    polygon = shape(geo_json)
-                    parsed_areas.append({
-                        "name": item.get("pln_area_n", "UNKNOWN"),
-                        "geometry": polygon,
-                        "raw": item
-                    })
-                except Exception as e:
-                    logger.warning(f"Failed to parse planning area {item.get('pln_area_n')}: {e}")
-            
-            self.planning_areas = parsed_areas
-            logger.info(f"Successfully loaded {len(self.planning_areas)} planning areas.")
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error serving OneMap API request: {e}")
-            raise
+            (self.planning_areas, self.spatial_index,
+             self.planning_area_geojson, self._polygon_arrays) = _shared_planning_areas(self.token, year)
+        except _NoPlanningAreas:
+            # Transient OneMap failure: stay empty so the next call fetches again
+            logger.warning(f"No planning areas loaded for {year}; will retry on next use.")
+            self.spatial_index = STRtree([])
+            self.planning_area_geojson = {"type": "FeatureCollection", "features": []}
+            self._polygon_arrays = None
+        # (minx, miny, maxx, maxy) over all areas, for rejecting far-off points without a tree query
+        self._extent = tuple(shapely.total_bounds(self.spatial_index.geometries)) if self.planning_areas else None
+        # Drop any misses recorded while no areas were loaded
+        self._cached_lookup.cache_clear()
 
     def get_theme_data(self, query_name):
         """
@@ -87,13 +230,20 @@ class OneMapClient:
         
         try:
             logger.info(f"Fetching theme '{query_name}'...")
-            response = requests.get(endpoint, headers=self._get_headers(), params=params)
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch theme {query_name}: {response.status_code}")
-                return []
+            with self.session.get(endpoint, headers=self._get_headers(), params=params, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to fetch theme {query_name}: {response.status_code}")
+                    return []
                 
-            data = response.json()
-            results = data.get("SrchResults") or data.get("SrchCmd") or []
+                if ijson is not None:
+                    # Parse straight off the socket so the raw body is never held alongside the parsed objects
+                    response.raw.decode_content = True
+                    # Same key precedence as the buffered path: SrchResults, else SrchCmd
+                    top_level = dict(ijson.kvitems(response.raw, "", use_float=True))
+                    results = top_level.get("SrchResults") or top_level.get("SrchCmd") or []
+                else:
+                    data = orjson.loads(response.content)
+                    results = data.get("SrchResults") or data.get("SrchCmd") or []
             
             if isinstance(results, list):
                 logger.info(f"Theme '{query_name}' returned {len(results)} items.")
@@ -106,6 +256,24 @@ class OneMapClient:
             logger.error(f"Error fetching theme {query_name}: {e}")
             return []
 
+    def get_themes_bulk(self, query_names, max_workers=8):
+        """
+        Fetches several themes concurrently over the shared session.
+        
+        Args:
+            query_names (list): Theme query names.
+            max_workers (int): Maximum concurrent requests (matches the session pool size).
+            
+        Returns:
+            dict: { query_name: [result items...], ... } (empty list for failed themes).
+        """
+        query_names = list(query_names)
+        if not query_names:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(query_names))) as executor:
+            return dict(zip(query_names, executor.map(self.get_theme_data, query_names)))
+
     def get_all_themes_info(self):
         """
         Fetches the list of all available themes.
@@ -115,7 +283,7 @@ class OneMapClient:
         endpoint = f"{self.BASE_URL}/themesvc/getAllThemesInfo"
         try:
             # This endpoint often requires no params but headers might help if token needed.
-            response = requests.get(endpoint, headers=self._get_headers())
+            response = self.session.get(endpoint, headers=self._get_headers())
             if response.status_code != 200:
                 logger.error(f"Failed to get themes info: {response.status_code}")
                 return []
@@ -139,42 +307,96 @@ class OneMapClient:
         """
         if not self.planning_areas:
             self.load_planning_areas()
-            
+        
+        return self._cached_lookup(float(lat), float(lon))
+
+    def _lookup_planning_area(self, lat, lon):
+        """Uncached single-point lookup behind get_planning_area."""
+        if self._extent is None:
+            return None
+        
+        minx, miny, maxx, maxy = self._extent
+        if not (minx <= lon <= maxx and miny <= lat <= maxy):
+            return None
+        
         point = Point(lon, lat)
         
-        for area in self.planning_areas:
-            if area["geometry"].contains(point):
-                return area["name"]
+        for idx in self.spatial_index.query(point):
+            if self.planning_areas[idx]["geometry"].contains(point):
+                return self.planning_areas[idx]["name"]
         
         return None
 
-    def map_points(self, points):
+    def get_planning_area_indices(self, lats, lons):
+        """
+        Maps arrays of coordinates to Planning Areas in a single vectorized pass.
+        
+        Args:
+            lats (array-like): Latitudes
+            lons (array-like): Longitudes
+            
+        Returns:
+            np.ndarray: Index into self.planning_areas for each point, or -1 if not found.
+        """
+        if not self.planning_areas:
+            self.load_planning_areas()
+        
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        area_idx = np.full(len(lats), -1, dtype=np.intp)
+        
+        if not len(lats):
+            return area_idx
+        
+        if self._polygon_arrays is not None and len(lats) > self.JIT_BATCH_THRESHOLD:
+            # Large batches: bbox-filtered scan over the flattened polygons, no Shapely objects at all
+            valid = np.isfinite(lats) & np.isfinite(lons)
+            area_idx[valid] = pip_batch(lons[valid], lats[valid], *self._polygon_arrays)
+            return area_idx
+        
+        points = shapely.points(lons, lats)
+        
+        if self._polygon_arrays is not None:
+            # Bounding-box candidates from the tree, exact test in the compiled kernel
+            pt_idx, poly_idx = self.spatial_index.query(points)
+            candidates_idx, candidates_ptr = candidates_csr(pt_idx, poly_idx, len(points))
+            return pip_bulk(lons, lats, *self._polygon_arrays, candidates_idx, candidates_ptr)
+        
+        # Bounding-box candidates, then one vectorized contains() on the prepared polygons
+        pt_idx, poly_idx = self.spatial_index.query(points)
+        hits = shapely.contains(self.spatial_index.geometries[poly_idx], points[pt_idx])
+        area_idx[pt_idx[hits]] = poly_idx[hits]
+        
+        return area_idx
+
+    def map_points(self, points, as_records=False):
         """
         Batch processes a list of points.
         
         Args:
             points (list): List of dicts {'lat': float, 'lon': float} 
                            OR list of tuples [(lat, lon), ...]
+            as_records (bool): Return a list of dicts instead of a DataFrame.
                            
         Returns:
-            list: List of dicts including the original lat/lon and 'planning_area'.
+            pd.DataFrame: Columns ['lat', 'lon', 'planning_area'] (None where not found),
+                          or a list of dicts with the same keys if as_records is True.
         """
-        results = []
-        for p in points:
-            if isinstance(p, dict):
-                lat, lon = p['lat'], p['lon']
-            else:
-                lat, lon = p[0], p[1]
-                
-            area = self.get_planning_area(lat, lon)
-            
-            results.append({
-                "lat": lat,
-                "lon": lon,
-                "planning_area": area
-            })
-            
-        return results
+        coords = [(p['lat'], p['lon']) if isinstance(p, dict) else (p[0], p[1]) for p in points]
+        lats = np.array([c[0] for c in coords], dtype=np.float64)
+        lons = np.array([c[1] for c in coords], dtype=np.float64)
+        
+        area_idx = self.get_planning_area_indices(lats, lons)
+        
+        # Trailing None so that index -1 (not found) maps to None
+        area_names = np.array([a["name"] for a in self.planning_areas] + [None], dtype=object)
+        
+        df = pd.DataFrame({
+            "lat": lats,
+            "lon": lons,
+            "planning_area": pd.Series(area_names[area_idx], dtype=object)
+        })
+        return df.to_dict('records') if as_records else df
 
 # Example Usage Block (if run as script)
 if __name__ == "__main__":
@@ -198,7 +420,7 @@ if __name__ == "__main__":
     client = OneMapClient(token=token)
     
     try:
-        mapped = client.map_points(test_points)
+        mapped = client.map_points(test_points, as_records=True)
         print(json.dumps(mapped, indent=2))
     except Exception as e:
         print(f"Failed: {e}")
@@ -1,6 +1,34 @@
-import requests
 import datetime
-from math import radians, sin, cos, sqrt, atan2
+import threading
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from http_session import create_session
+
+# Data.gov.sg readings update every few minutes; share parsed responses across clients briefly.
+# This is the only cache over the readings, so its TTL bounds how stale any caller's data can be.
+# The lock only guards the cache itself so concurrent fetches of different endpoints still overlap.
+_response_cache = TTLCache(maxsize=32, ttl=60)
+_response_lock = threading.Lock()
+
+READING_UNITS = {
+    "temperature": "deg C",
+    "humidity": "%",
+    "wind_speed": "knots",
+    "wind_direction": "deg",
+    "rainfall": "mm",
+    "pm25": "ug/m3",
+    "psi": "index"
+}
+
+class Reading(NamedTuple):
+    """Nearest-station reading for one metric."""
+    value: float
+    unit: str
+    station_dist_km: float
+    source: str
 
 class DataGovClient:
     """
@@ -8,32 +36,73 @@ class DataGovClient:
     Includes Weather (Temp, Humidity, Wind, Rain) and Air Quality (PM2.5, PSI).
     """
     BASE_URL_V2 = "https://api-open.data.gov.sg/v2/real-time/api"
+    REQUEST_TIMEOUT = 5
+
+    def __init__(self):
+        # Pooled keep-alive session (requests already negotiates gzip) with retries and a default timeout
+        self.session = create_session(timeout=self.REQUEST_TIMEOUT)
 
     def _get_data(self, endpoint, params=None):
+        cache_key = (endpoint, frozenset((params or {}).items()))
+        with _response_lock:
+            cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             url = f"{self.BASE_URL_V2}/{endpoint}"
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json()
+            data = orjson.loads(response.content)
         except Exception as e:
             print(f"Error fetching {endpoint}: {e}")
             return None
+        
+        with _response_lock:
+            _response_cache[cache_key] = data
+        return data
+
+    WEATHER_ENDPOINTS = {
+        "temperature": "air-temperature",
+        "humidity": "relative-humidity",
+        "wind_direction": "wind-direction",
+        "wind_speed": "wind-speed",
+        "rainfall": "rainfall"
+    }
+    AIR_QUALITY_ENDPOINTS = {
+        "psi": "psi",
+        "pm25": "pm25"
+    }
+
+    def _get_many(self, endpoints):
+        """
+        Fetches several endpoints concurrently over the pooled session.
+        Args:
+            endpoints (dict): { 'result_key': 'endpoint', ... }
+        Returns:
+            dict: { 'result_key': response_json_or_None, ... }
+        """
+        with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+            return dict(zip(endpoints, executor.map(self._get_data, endpoints.values())))
 
     def get_weather_suite(self):
         """Fetches a comprehensive snapshot of current weather conditions."""
-        return {
-            "temperature": self._get_data("air-temperature"),
-            "humidity": self._get_data("relative-humidity"),
-            "wind_direction": self._get_data("wind-direction"),
-            "wind_speed": self._get_data("wind-speed"),
-            "rainfall": self._get_data("rainfall")
-        }
+        return self._get_many(self.WEATHER_ENDPOINTS)
 
     def get_air_quality(self):
         """Fetches PSI and PM2.5 readings."""
+        return self._get_many(self.AIR_QUALITY_ENDPOINTS)
+
+    def get_all_suites(self):
+        """
+        Fetches the weather and air-quality suites in one concurrent burst (all 7 endpoints).
+        Returns:
+            dict: { 'weather': {...}, 'air_quality': {...} }
+        """
+        responses = self._get_many({**self.WEATHER_ENDPOINTS, **self.AIR_QUALITY_ENDPOINTS})
         return {
-            "psi": self._get_data("psi"),
-            "pm25": self._get_data("pm25")
+            "weather": {key: responses[key] for key in self.WEATHER_ENDPOINTS},
+            "air_quality": {key: responses[key] for key in self.AIR_QUALITY_ENDPOINTS}
         }
 
     def get_island_wide_weather(self, reading_type="air-temperature"):
@@ -104,22 +173,29 @@ class PerceptionAgent:
     def __init__(self):
         self.weather_client = DataGovClient()
 
-    def get_environmental_context(self, lat, lng):
+    def get_environmental_context(self, lat, lng, suites=None):
         """
         Gathers all relevant environmental data for a specific location.
+        Pass suites (from get_all_suites) when looping over many locations to reuse one fetch.
         """
-        weather = self.weather_client.get_weather_suite()
-        air = self.weather_client.get_air_quality()
+        if suites is None:
+            suites = self.get_all_suites()
         
         context = {
             "timestamp": datetime.datetime.now().isoformat(),
             "location": {"lat": lat, "lng": lng},
-            "weather": self._extract_nearest_reading(weather, lat, lng),
-            "air_quality": self._extract_nearest_reading(air, lat, lng)
+            "weather": self._extract_nearest_reading(suites["weather"], lat, lng),
+            "air_quality": self._extract_nearest_reading(suites["air_quality"], lat, lng)
         }
         
         return context
 
+    def get_all_suites(self):
+        """
+        Fetches weather and air-quality data for all stations in one concurrent burst.
+        """
+        return self.weather_client.get_all_suites()
+
     def get_island_wide_weather(self, reading_type="air-temperature"):
         """
         Delegates to the weather client to fetch island-wide data.
@@ -131,6 +207,7 @@ class PerceptionAgent:
         """
         Helper to parse the Data.gov.sg response structure and find the nearest station/region.
         Handles both Station-based (Weather) and Region-based (Air Quality) formats.
+        Returns a dict of metric key -> Reading.
         """
         consolidated = {}
         
@@ -158,25 +235,21 @@ class PerceptionAgent:
 
             try:
                 # 1. Find nearest location (station or region)
-                nearest = None
-                min_dist = float('inf')
+                # Structure varies: loc['location']['latitude'] vs loc['label_location']['latitude']
+                located = [(loc, loc.get('location') or loc.get('label_location')) for loc in locations]
+                located = [(loc, coords) for loc, coords in located if coords]
                 
-                for loc in locations:
-                    # Structure varies: loc['location']['latitude'] vs loc['label_location']['latitude']
-                    coords = loc.get('location') or loc.get('label_location')
-                    if not coords: continue
-                    
-                    s_lat = coords['latitude']
-                    s_lng = coords['longitude']
-                    dist = self._haversine(lat, lng, s_lat, s_lng)
-                    
-                    if dist < min_dist:
-                        min_dist = dist
-                        nearest = loc
-                
-                if not nearest:
+                if not located:
                     continue
                 
+                s_lat = np.array([coords['latitude'] for _, coords in located], dtype=float)
+                s_lng = np.array([coords['longitude'] for _, coords in located], dtype=float)
+                distances = self._haversine_np(lat, lng, s_lat, s_lng)
+                
+                nearest_idx = int(np.nanargmin(distances))
+                nearest = located[nearest_idx][0]
+                min_dist = float(distances[nearest_idx])
+                
                 # 2. Extract the relevant reading for this location
                 readings_list = data_block.get('readings', [])
                 if not readings_list:
@@ -210,12 +283,12 @@ class PerceptionAgent:
                         value = region_readings.get(region_name)
 
                 if value is not None:
-                    consolidated[key] = {
-                        "value": value,
-                        "unit": self._get_unit(key),
-                        "station_dist_km": round(min_dist, 2),
-                        "source": nearest.get('name', nearest.get('id'))
-                    }
+                    consolidated[key] = Reading(
+                        value,
+                        self._get_unit(key),
+                        round(min_dist, 2),
+                        nearest.get('name', nearest.get('id'))
+                    )
                     
             except Exception as e:
                 pass
@@ -223,25 +296,16 @@ class PerceptionAgent:
         return consolidated
 
     def _get_unit(self, key):
-        units = {
-            "temperature": "deg C",
-            "humidity": "%",
-            "wind_speed": "knots",
-            "wind_direction": "deg",
-            "rainfall": "mm",
-            "pm25": "ug/m3",
-            "psi": "index"
-        }
-        return units.get(key, "")
+        return READING_UNITS.get(key, "")
 
-    def _haversine(self, lat1, lon1, lat2, lon2):
+    def _haversine_np(self, lat, lon, lats, lons):
         """
-        Calculate the great circle distance between two points 
-        on the earth (specified in decimal degrees)
+        Vectorized great circle distance (km) from one point to arrays of points,
+        all in decimal degrees.
         """
         R = 6371  # Earth radius in km
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
+        lat_rad, lats_rad = np.radians(lat), np.radians(lats)
+        dlat = lats_rad - lat_rad
+        dlon = np.radians(lons) - np.radians(lon)
+        a = np.sin(dlat / 2)**2 + np.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2)**2
+        return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -0,0 +1,131 @@
+"""
+Point-in-Polygon Kernel
+Numba-compiled crossing-number test over planning-area polygons flattened into
+plain coordinate arrays, for bulk point mapping without per-point GEOS calls.
+
+Numba is optional: if it is not installed, NUMBA_AVAILABLE is False and callers
+fall back to Shapely's vectorized STRtree predicates.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def flatten_polygons(geometries):
+    """
+    Flattens (Multi)Polygons into struct-of-arrays form.
+    
+    Returns:
+        tuple: (verts_x, verts_y, ring_starts, poly_starts, bboxes) where
+            verts_x[ring_starts[r]:ring_starts[r + 1]] are the vertices of ring r,
+            rings poly_starts[p]:poly_starts[p + 1] belong to polygon p (exterior and holes),
+            bboxes[p] is (minx, miny, maxx, maxy).
+    """
+    xs, ys = [], []
+    ring_starts, poly_starts = [0], [0]
+    n_verts = 0
+    
+    for geom in geometries:
+        for part in getattr(geom, 'geoms', [geom]):
+            if part.is_empty:
+                continue
+            for ring in [part.exterior, *part.interiors]:
+                coords = np.asarray(ring.coords, dtype=np.float64)
+                xs.append(coords[:, 0])
+                ys.append(coords[:, 1])
+                n_verts += len(coords)
+                ring_starts.append(n_verts)
+        poly_starts.append(len(ring_starts) - 1)
+    
+    verts_x = np.concatenate(xs) if xs else np.empty(0, dtype=np.float64)
+    verts_y = np.concatenate(ys) if ys else np.empty(0, dtype=np.float64)
+    bboxes = np.array([g.bounds for g in geometries], dtype=np.float64).reshape(-1, 4)
+    
+    return (
+        verts_x,
+        verts_y,
+        np.array(ring_starts, dtype=np.int64),
+        np.array(poly_starts, dtype=np.int64),
+        bboxes
+    )
+
+
+def candidates_csr(pt_idx, poly_idx, n_points):
+    """
+    Converts (point, polygon) candidate pairs from an STRtree query into CSR form:
+    candidates_idx[candidates_ptr[i]:candidates_ptr[i + 1]] are the polygons for point i.
+    """
+    order = np.argsort(pt_idx, kind='stable')
+    candidates_idx = poly_idx[order].astype(np.int64)
+    candidates_ptr = np.searchsorted(pt_idx[order], np.arange(n_points + 1)).astype(np.int64)
+    return candidates_idx, candidates_ptr
+
+
+if NUMBA_AVAILABLE:
+    @njit(inline='always')
+    def _in_polygon(x, y, p, verts_x, verts_y, ring_starts, poly_starts, bboxes):
+        """
+        Bbox check, then even-odd crossing count over all rings of polygon p,
+        so holes are excluded. Inlined into each kernel (and compiled with its flags).
+        """
+        if x < bboxes[p, 0] or x > bboxes[p, 2] or y < bboxes[p, 1] or y > bboxes[p, 3]:
+            return False
+        
+        inside = False
+        for r in range(poly_starts[p], poly_starts[p + 1]):
+            start = ring_starts[r]
+            end = ring_starts[r + 1]
+            j = end - 1
+            for k in range(start, end):
+                xk = verts_x[k]
+                yk = verts_y[k]
+                xj = verts_x[j]
+                yj = verts_y[j]
+                if (yk > y) != (yj > y) and x < (xj - xk) * (y - yk) / (yj - yk) + xk:
+                    inside = not inside
+                j = k
+        return inside
+
+    @njit(parallel=True, cache=True)
+    def pip_bulk(px, py, verts_x, verts_y, ring_starts, poly_starts, bboxes, candidates_idx, candidates_ptr):
+        """
+        Returns, for each point, the first candidate polygon containing it, or -1.
+        """
+        n = px.shape[0]
+        out = np.full(n, -1, dtype=np.int64)
+        
+        for i in prange(n):
+            for c in range(candidates_ptr[i], candidates_ptr[i + 1]):
+                p = candidates_idx[c]
+                if _in_polygon(px[i], py[i], p, verts_x, verts_y, ring_starts, poly_starts, bboxes):
+                    out[i] = p
+                    break
+        
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def pip_batch(px, py, verts_x, verts_y, ring_starts, poly_starts, bboxes):
+        """
+        Returns, for each point, the first polygon containing it, or -1.
+        Scans every polygon behind a bbox prefilter, so no spatial index or Shapely
+        points are needed. Points must be finite (fastmath assumes no NaNs).
+        """
+        n = px.shape[0]
+        n_polys = bboxes.shape[0]
+        out = np.full(n, -1, dtype=np.int64)
+        
+        for i in prange(n):
+            for p in range(n_polys):
+                if _in_polygon(px[i], py[i], p, verts_x, verts_y, ring_starts, poly_starts, bboxes):
+                    out[i] = p
+                    break
+        
+        return out
+else:
+    pip_bulk = None
+    pip_batch = None
@@ -4,6 +4,7 @@ Provides risk estimates for areas without temperature data using green ratio and
 """
 
 import pandas as pd
+import numpy as np
 import logging
 from typing import Dict, List
 from data_fusion import DataFusion
@@ -22,18 +23,41 @@ class EnhancedTriggerRules:
     GREEN_LOW = 0.2
     GREEN_CRITICAL = 0.1
     
-    def __init__(self, dataset: pd.DataFrame = None):
+    # (priority, reason template) per rule, in precedence order; matched in _match_rules
+    TEMPERATURE_RULES = [
+        ('CRITICAL', "CRITICAL: Extreme heat ({temp}°C) in commercial zone with minimal green coverage ({green:.0%})"),
+        ('HIGH', "HIGH: Elevated temperature ({temp}°C) with low green ratio ({green:.0%})"),
+        ('HIGH', "HIGH: Critical temperature threshold exceeded ({temp}°C)"),
+        ('MEDIUM', "MEDIUM: Elevated heat in commercial area with minimal greenery"),
+        ('MEDIUM', "MEDIUM: Potential heat island in residential area ({temp}°C, {green:.0%} green)"),
+    ]
+    TEMPERATURE_NORMAL = "Normal conditions ({temp}°C, {green:.0%} green, {density})"
+    
+    CONTEXT_RULES = [
+        ('MEDIUM', "INFERRED: Commercial zone with minimal green coverage ({green:.0%}) - likely heat-prone"),
+        ('MEDIUM', "INFERRED: Very low green coverage ({green:.0%}) suggests heat island risk"),
+        ('LOW', "INFERRED: Residential area with low green coverage ({green:.0%})"),
+    ]
+    CONTEXT_NORMAL = "INFERRED: Adequate green coverage ({green:.0%}, {density})"
+    
+    def __init__(self, dataset: pd.DataFrame = None, client=None):
         if dataset is not None:
             self.df = dataset
         else:
-            fusion = DataFusion()
+            fusion = DataFusion(client=client)
             self.df = fusion.get_unified_dataset()
+        
+        # Row position per planning area (first occurrence) for O(1) lookups
+        self._row_by_area = {}
+        if 'planning_area' in self.df:
+            for pos, name in enumerate(self.df['planning_area']):
+                self._row_by_area.setdefault(name, pos)
     
     def evaluate_area(self, planning_area: str) -> Dict:
         """Evaluates trigger rules with context-based fallback."""
-        area_data = self.df[self.df['planning_area'] == planning_area]
-        
-        if area_data.empty:
+        try:
+            pos = self._row_by_area[planning_area]
+        except KeyError:
             return {
                 'trigger': False,
                 'reason': f"Planning area '{planning_area}' not found.",
@@ -41,82 +65,84 @@ class EnhancedTriggerRules:
                 'details': {}
             }
         
-        row = area_data.iloc[0]
-        temp = row['avg_temperature']
-        green = row['green_ratio']
-        density = row['density_type']
-        
-        # If temperature data exists, use temperature-based rules
-        if pd.notna(temp):
-            return self._evaluate_with_temperature(planning_area, temp, green, density)
-        
-        # Otherwise, infer risk from context (green ratio + density)
-        return self._infer_from_context(planning_area, green, density)
-    
-    def _evaluate_with_temperature(self, area, temp, green, density):
-        """Original temperature-based evaluation."""
-        triggers = []
-        priority = 'NORMAL'
-        
-        # Determine priority based on temperature and green/density context
-        if temp >= self.TEMP_CRITICAL and green < self.GREEN_CRITICAL and density == 'Commercial':
-            triggers.append(f"CRITICAL: Extreme heat ({temp}°C) in commercial zone with minimal green coverage ({green:.0%})")
-            priority = 'CRITICAL'
-        elif temp >= self.TEMP_HIGH and green < self.GREEN_LOW:
-            triggers.append(f"HIGH: Elevated temperature ({temp}°C) with low green ratio ({green:.0%})")
-            priority = 'HIGH'
-        elif temp >= self.TEMP_CRITICAL:
-            triggers.append(f"HIGH: Critical temperature threshold exceeded ({temp}°C)")
-            priority = 'HIGH'
-        elif temp >= self.TEMP_HIGH and density == 'Commercial' and green < self.GREEN_CRITICAL:
-            triggers.append(f"MEDIUM: Elevated heat in commercial area with minimal greenery")
-            priority = 'MEDIUM'
-        elif temp >= self.TEMP_HIGH and density == 'Residential' and green < self.GREEN_LOW:
-            triggers.append(f"MEDIUM: Potential heat island in residential area ({temp}°C, {green:.0%} green)")
-            priority = 'MEDIUM'
-        
-        trigger = len(triggers) > 0
-        reason = triggers[0] if triggers else f"Normal conditions ({temp}°C, {green:.0%} green, {density})"
-        
-        return {
-            'trigger': trigger,
-            'reason': reason,
-            'priority': priority,
-            'details': {
-                'planning_area': area,
-                'avg_temperature': temp,
-                'green_ratio': green,
-                'density_type': density,
-                'all_triggers': triggers,
-                'data_source': 'temperature'
-            }
-        }
+        return self._evaluate_frame(self.df.iloc[pos:pos + 1])[0]
     
-    def _infer_from_context(self, area, green, density):
+    def _match_rules(self, temp, green, density):
         """
-        Infers risk level from green ratio and density type when temperature is unavailable.
+        Matches every area against the rules in one vectorized pass.
+        Returns:
+            tuple: (has_temp, rule) arrays; rule indexes TEMPERATURE_RULES where temperature
+                   is known and CONTEXT_RULES otherwise, or is -1 when nothing triggers.
         """
-        priority = 'NORMAL'
-        reason = f"INFERRED: Adequate green coverage ({green:.0%}, {density})"
-        trigger = False
-        
-        # Analyze context for risk inference
-        if density == 'Commercial' and green < self.GREEN_CRITICAL:
-            priority = 'MEDIUM'
-            reason = f"INFERRED: Commercial zone with minimal green coverage ({green:.0%}) - likely heat-prone"
-            trigger = True
-        elif green < self.GREEN_CRITICAL:
-            priority = 'MEDIUM'
-            reason = f"INFERRED: Very low green coverage ({green:.0%}) suggests heat island risk"
-            trigger = True
-        elif density == 'Residential' and green < self.GREEN_LOW:
-            priority = 'LOW'
-            reason = f"INFERRED: Residential area with low green coverage ({green:.0%})"
-            trigger = True
+        has_temp = ~np.isnan(temp)
+        is_commercial = density == 'Commercial'
+        is_residential = density == 'Residential'
+        
+        # NaN temperatures compare False, so these only match areas with readings
+        temp_rule = np.select([
+            (temp >= self.TEMP_CRITICAL) & (green < self.GREEN_CRITICAL) & is_commercial,
+            (temp >= self.TEMP_HIGH) & (green < self.GREEN_LOW),
+            temp >= self.TEMP_CRITICAL,
+            (temp >= self.TEMP_HIGH) & is_commercial & (green < self.GREEN_CRITICAL),
+            (temp >= self.TEMP_HIGH) & is_residential & (green < self.GREEN_LOW),
+        ], range(len(self.TEMPERATURE_RULES)), default=-1)
+        
+        # Without temperature, infer risk from context (green ratio + density)
+        context_rule = np.select([
+            is_commercial & (green < self.GREEN_CRITICAL),
+            green < self.GREEN_CRITICAL,
+            is_residential & (green < self.GREEN_LOW),
+        ], range(len(self.CONTEXT_RULES)), default=-1)
+        
+        return has_temp, np.where(has_temp, temp_rule, context_rule)
+    
+    def _evaluate_frame(self, df):
+        """Evaluates every row of df, returning one result dict per planning area."""
+        if df.empty:
+            return []
+        
+        names = df['planning_area'].to_numpy()
+        temp = df['avg_temperature'].to_numpy(dtype=float, na_value=np.nan)
+        green = df['green_ratio'].to_numpy(dtype=float)
+        density = df['density_type'].to_numpy(dtype=object)
+        
+        has_temp, rule = self._match_rules(temp, green, density)
+        
+        return [
+            self._build_result(*row)
+            for row in zip(names, temp, green, density, has_temp.tolist(), rule.tolist())
+        ]
+    
+    def _build_result(self, area, temp, green, density, has_temp, rule):
+        """Formats the matched rule for one area into the result dict."""
+        fields = {'temp': temp, 'green': green, 'density': density}
+        
+        if has_temp:
+            priority = 'NORMAL'
+            triggers = []
+            if rule >= 0:
+                priority, template = self.TEMPERATURE_RULES[rule]
+                triggers.append(template.format(**fields))
+            
+            return {
+                'trigger': len(triggers) > 0,
+                'reason': triggers[0] if triggers else self.TEMPERATURE_NORMAL.format(**fields),
+                'priority': priority,
+                'details': {
+                    'planning_area': area,
+                    'avg_temperature': temp,
+                    'green_ratio': green,
+                    'density_type': density,
+                    'all_triggers': triggers,
+                    'data_source': 'temperature'
+                }
+            }
+        
+        priority, template = self.CONTEXT_RULES[rule] if rule >= 0 else ('NORMAL', self.CONTEXT_NORMAL)
         
         return {
-            'trigger': trigger,
-            'reason': reason,
+            'trigger': rule >= 0,
+            'reason': template.format(**fields),
             'priority': priority,
             'details': {
                 'planning_area': area,
@@ -129,11 +155,11 @@ class EnhancedTriggerRules:
     
     def evaluate_all(self) -> List[Dict]:
         """Evaluates ALL areas (with or without temperature data)."""
-        results = []
+        # DataFusion returns a column-less frame when there is no data
+        if self.df.empty:
+            return []
         
-        for _, row in self.df.iterrows():
-            result = self.evaluate_area(row['planning_area'])
-            results.append(result)
+        results = self._evaluate_frame(self.df)
         
         # Sort by priority
         priority_order = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3, 'NORMAL': 4}